@@ -4,12 +4,13 @@ import traceback
 import sys
 import os
 import numpy as np
-import math
 import json
+import orjson
 import yaml
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import socket
-import threading
+import asyncio
+import logging
 import time
 
 current_dir = os.path.dirname(os.path.abspath(__file__))  
@@ -18,12 +19,43 @@ import dual_arm_collision as dac
 
 from readDualArmSelfCollisionModelFromJson import (
     read_dual_arm_self_collision_model_from_json,
+    load_collision_model_cache,
+    save_collision_model_cache,
     DualArmColliderConfiguration,
     RobotType,
-    LozengeModelCo,
-    CapsuleModel,
-    BallModel
+    CapsuleSlot,
+    BallSlot,
+    LozengeSlot
 )
+from collision_protocol import (
+    HEADER,
+    MSG_JOINT_DATA,
+    MSG_JSON,
+    JOINT_DATA,
+    MAX_PAYLOAD,
+    RESULT_FRAME_MAX,
+    RESULT_ERROR,
+    pack_frame,
+    pack_collision_result_into
+)
+
+# 每周期输出的调试信息通过logger输出，默认级别下不构造日志字符串
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# 关节位置/速度变化均小于该阈值时，复用上一次的碰撞检测结果
+JOINT_CHANGE_TOLERANCE = 1e-5
+
+# 初始化使用的默认关节位置（弧度），左臂6个 + 右臂6个
+INIT_JOINT_POS_RAD = np.deg2rad([0, 0, 0, 0, 0, 0,
+                                 -90, 50, 140, 0, 0, 0])
+
+
+def set_axis_values(axis: dac.dualarm_tagAXISPOS_REF, values) -> None:
+    """一次性写入12个关节值（pybind11结构体不支持内存拷贝，用解包赋值代替逐个setattr）"""
+    (axis.a0, axis.a1, axis.a2, axis.a3, axis.a4, axis.a5,
+     axis.a6, axis.a7, axis.a8, axis.a9, axis.a10, axis.a11) = values
+
 
 class CollisionDetectionServer:
     def __init__(self, host='0.0.0.0', port=9092):
@@ -31,20 +63,32 @@ class CollisionDetectionServer:
         self.port = port
         self.server_socket = None
         self.running = False
+        self.client_tasks = set()
         
         # 初始化配置和碰撞检测相关变量
         self.json_config_path = "/usr/local/RobotOS/home/RobotOS/dual_arm_server/dual_arm_collision.json"
         self.tool_config_path = "/usr/local/RobotOS/home/RobotOS/dual_arm_server/dualarm_tool_collision.json"
+        self.config_cache_path = os.path.splitext(self.json_config_path)[0] + ".npz"
         
         self.config = None
         self.init_params = None
         self.joint_pos = dac.dualarm_tagAXISPOS_REF()  # 12个关节位置
         self.joint_vel = dac.dualarm_tagAXISPOS_REF()  # 12个关节速度
         
+        # 最近一次送入dac的关节状态（位置12个 + 速度12个），NaN表示需要重新计算
+        self.joint_state = np.empty(24)
+        self.last_joint_state = np.full(24, np.nan)
+        self.joints_changed = True
+        
         # 碰撞检测结果
         self.collision_detected = False
         self.colliding_pairs = []
         self.min_distance = 0.0
+        self.last_result = None
+        # 最近一次碰撞检测失败的错误信息
+        self.collision_error = None
+        # 本次关节状态未能写入dac，此时dac中仍是旧状态，检测结果不可信
+        self.update_failed = False
         
         # 工具碰撞模型配置
         self.tool_config = self.load_tool_config()
@@ -165,7 +209,18 @@ class CollisionDetectionServer:
         try:
             print(f"Loading configuration from {self.json_config_path}")
             self.config = DualArmColliderConfiguration()
+            
+            # JSON文件未修改时直接使用解析缓存
+            source_mtime = os.path.getmtime(self.json_config_path)
+            if load_collision_model_cache(self.config_cache_path, self.config, source_mtime):
+                print(f"Configuration loaded from cache {self.config_cache_path}")
+                return True
+            
             read_dual_arm_self_collision_model_from_json(self.json_config_path, self.config)
+            try:
+                save_collision_model_cache(self.config_cache_path, self.config, source_mtime)
+            except Exception as e:
+                print(f"写入碰撞配置缓存失败: {str(e)}")
             return True
         except Exception as e:
             print(f"Error loading config: {str(e)}")
@@ -174,58 +229,32 @@ class CollisionDetectionServer:
     def convert_config(self) -> bool:
         """将配置对象转换为init_dual_arm函数所需的参数"""
         try:
-            # 构建棱体模型参数（13个值：ref2local_frame(6) + geometry(4) + offset(3)）
-            def build_lozenge_params(lozenge: LozengeModelCo) -> List[float]:
-                params = []
-                # 前6个值：参考系转换参数
-                params.extend(lozenge.ref2local_frame[:6])
-                params += [0.0] * (6 - len(lozenge.ref2local_frame[:6]))
-                # 中间4个值：几何参数
-                params.extend(lozenge.geometry[:4])
-                params += [0.0] * (4 - len(lozenge.geometry[:4]))
-                # 最后3个值：偏移量
-                params.extend(lozenge.offset[:3])
-                params += [0.0] * (3 - len(lozenge.offset[:3]))
-                return params[:13]  # 确保总长度为13
+            cfg = self.config
 
-            # 构建胶囊体模型参数（7个值：start(3) + end(3) + radius(1)）
-            def build_capsule_params(capsule: CapsuleModel) -> List[float]:
-                params = []
-                # 前3个值：起点坐标
-                params.extend(capsule.start[:3])
-                params += [0.0] * (3 - len(capsule.start[:3]))
-                # 中间3个值：终点坐标
-                params.extend(capsule.end[:3])
-                params += [0.0] * (3 - len(capsule.end[:3]))
-                # 最后1个值：半径
-                params.append(capsule.radius)
-                return params[:7]  # 确保总长度为7
+            # 胶囊体参数（每行7个值：start(3) + end(3) + radius(1)）
+            capsule_geo = np.empty((len(cfg.capsule_radii), 7))
+            capsule_geo[:, 0:3] = cfg.capsule_starts
+            capsule_geo[:, 3:6] = cfg.capsule_ends
+            capsule_geo[:, 6] = cfg.capsule_radii
 
-            # 构建腕部球体参数（4个值：offset(3) + radius(1)）
-            def build_wrist_params(wrist: BallModel) -> List[float]:
-                params = []
-                # 前3个值：偏移量
-                params.extend(wrist.offset[:3])
-                params += [0.0] * (3 - len(wrist.offset[:3]))
-                # 最后1个值：半径
-                params.append(wrist.radius)
-                return params[:4]  # 确保总长度为4
+            # 腕部球体参数（4个值：offset(3) + radius(1)）
+            wrist_geo = np.empty(4)
+            wrist_geo[0:3] = cfg.ball_offsets[BallSlot.L_wrist]
+            wrist_geo[3] = cfg.ball_radii[BallSlot.L_wrist]
 
-            # 生成各部分参数
-            platform_geo = build_lozenge_params(self.config.platform)
-            head_geo = build_lozenge_params(self.config.head)
-            truck_geo = build_lozenge_params(self.config.truck)
-            
-            base_geo = build_capsule_params(self.config.L_base)
-            lower_arm_geo = build_capsule_params(self.config.L_lowerArm)
-            elbow_geo = build_capsule_params(self.config.L_elbow)
-            upper_arm_geo = build_capsule_params(self.config.L_upperArm)
+            # 生成各部分参数（棱体每行即13个值：ref2local_frame(6) + geometry(4) + offset(3)）
+            # init_dual_arm可直接接收float64数组，无需转换为列表
+            platform_geo = cfg.lozenges[LozengeSlot.platform]
+            head_geo = cfg.lozenges[LozengeSlot.head]
+            truck_geo = cfg.lozenges[LozengeSlot.truck]
             
-            wrist_geo = build_wrist_params(self.config.L_wrist)
+            base_geo = capsule_geo[CapsuleSlot.L_base]
+            lower_arm_geo = capsule_geo[CapsuleSlot.L_lowerArm]
+            elbow_geo = capsule_geo[CapsuleSlot.L_elbow]
+            upper_arm_geo = capsule_geo[CapsuleSlot.L_upperArm]
 
-            # 确保DH参数为4个值
-            dh_params = self.config.dh[:4]
-            dh_params += [0.0] * (4 - len(dh_params))
+            # DH参数固定为4个值
+            dh_params = cfg.dh
 
             self.init_params = (
                 self.config.robType,            # robType
@@ -249,16 +278,8 @@ class CollisionDetectionServer:
     def init_dual_arm(self) -> bool:
         """初始化双机械臂模型"""
         try:
-            # 使用默认关节位置
-            left_pos = [math.radians(angle) for angle in [0, 0, 0, 0, 0, 0]]
-            right_pos = [math.radians(angle) for angle in [-90, 50, 140, 0, 0, 0]]
-            
-            # 拼接左右臂关节位置（左臂6个 + 右臂6个 = 12个）
-            joint_values = left_pos + right_pos
-            
             # 设置初始关节位置
-            for i, value in enumerate(joint_values):
-                setattr(self.joint_pos, f"a{i}", value)
+            set_axis_values(self.joint_pos, INIT_JOINT_POS_RAD)
             
             # 初始化双机械臂
             dac.init_dual_arm(
@@ -326,18 +347,39 @@ class CollisionDetectionServer:
     
     def update_joints(self, joint_positions: List[float], joint_velocities: List[float]):
         """更新关节状态"""
+        self.update_failed = False
         try:
-            # 更新关节位置和速度
-            for i in range(12):
-                setattr(self.joint_pos, f"a{i}", joint_positions[i])
-                setattr(self.joint_vel, f"a{i}", joint_velocities[i])
+            state = self.joint_state
+            state[:12] = joint_positions
+            state[12:] = joint_velocities
+            
+            # 关节状态未变化（如伺服静止），跳过更新，沿用上一次的检测结果
+            if np.max(np.abs(state - self.last_joint_state)) < JOINT_CHANGE_TOLERANCE:
+                self.joints_changed = False
+                return
+            
+            # 更新关节位置和速度（转换为Python float后写入，比逐个读取numpy标量更快）
+            values = state.tolist()
+            set_axis_values(self.joint_pos, values[:12])
+            set_axis_values(self.joint_vel, values[12:])
             
             dac.update_joints(self.joint_pos, self.joint_vel)
+            self.last_joint_state[:] = state
         except Exception as e:
             print(f"更新关节状态错误: {str(e)}")
+            self.last_joint_state.fill(np.nan)
+            self.last_result = None
+            self.collision_error = f"更新关节状态错误: {str(e)}"
+            self.update_failed = True
+        self.joints_changed = True
     
-    def check_collision(self) -> dict:
-        """执行碰撞检测并返回结果"""
+    def check_collision(self) -> Optional[Tuple[bool, List[int], float]]:
+        """执行碰撞检测并返回结果（是否碰撞, 碰撞对, 最小距离），检测失败时返回None，错误信息见collision_error"""
+        if self.update_failed:
+            return None
+        if not self.joints_changed and self.last_result is not None:
+            return self.last_result
+        
         try:
             result, collider_pair_list, distance = dac.check_collision()
             
@@ -345,64 +387,130 @@ class CollisionDetectionServer:
             self.colliding_pairs = collider_pair_list
             self.min_distance = distance
             
-            print(f"碰撞检测结果: {result}, 碰撞对: {collider_pair_list}, 距离: {distance}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("碰撞检测结果: %s, 碰撞对: %s, 距离: %s", result, collider_pair_list, distance)
             
-            return {
-                'collision_detected': result,
-                'colliding_pairs': collider_pair_list,
-                'min_distance': distance
-            }
+            self.last_result = (result, collider_pair_list, distance)
+            return self.last_result
             
         except Exception as e:
             print(f"碰撞检测错误: {str(e)}")
             traceback.print_exc()
-            return {
-                'collision_detected': False,
-                'colliding_pairs': [],
-                'min_distance': 0.0,
-                'error': str(e)
-            }
+            # 下一周期强制重新检测
+            self.last_joint_state.fill(np.nan)
+            self.last_result = None
+            self.collision_error = str(e)
+            return None
     
-    def handle_client(self, conn, addr):
+    @staticmethod
+    async def recv_exactly(conn, view: memoryview, n: int) -> bool:
+        """读取恰好n字节到view[:n]，连接关闭时返回False"""
+        loop = asyncio.get_running_loop()
+        received = 0
+        while received < n:
+            count = await loop.sock_recv_into(conn, view[received:n])
+            if count == 0:
+                return False
+            received += count
+        return True
+    
+    async def handle_json_message(self, conn, addr, data: memoryview):
+        """处理JSON消息"""
+        loop = asyncio.get_running_loop()
+        try:
+            # 解析JSON数据（orjson可直接解析接收缓冲区，无需先解码为字符串）
+            received_data = orjson.loads(data)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Received from %s: %s", addr, received_data)
+            
+            # 检查消息类型
+            if received_data.get('type') == 'joint_data':
+                # 更新关节状态并检测碰撞（一次性转换为连续的double数组）
+                try:
+                    joint_positions = array.array('d', received_data['joint_positions'])
+                    joint_velocities = array.array('d', received_data['joint_velocities'])
+                except TypeError as e:
+                    print(f"Invalid joint data from {addr}: {str(e)}")
+                    response = {'error': 'Invalid joint data'}
+                    await loop.sock_sendall(conn, pack_frame(MSG_JSON, orjson.dumps(response)))
+                    return
+                
+                self.update_joints(joint_positions, joint_velocities)
+                detection = self.check_collision()
+                
+                # 发送碰撞检测结果，检测失败时附带error字段
+                if detection is None:
+                    result_data = {
+                        'collision_detected': False,
+                        'colliding_pairs': [],
+                        'min_distance': 0.0,
+                        'error': self.collision_error
+                    }
+                else:
+                    result, collider_pair_list, distance = detection
+                    result_data = {
+                        'collision_detected': result,
+                        'colliding_pairs': collider_pair_list,
+                        'min_distance': distance
+                    }
+                response = {
+                    'type': 'collision_result',
+                    'result': result_data
+                }
+                await loop.sock_sendall(conn, pack_frame(MSG_JSON, orjson.dumps(response)))
+                
+            elif received_data.get('type') == 'ping':
+                # 心跳检测
+                response = {'type': 'pong'}
+                await loop.sock_sendall(conn, pack_frame(MSG_JSON, orjson.dumps(response)))
+                
+        except orjson.JSONDecodeError as e:
+            print(f"JSON decode error: {str(e)}")
+            response = {'error': 'Invalid JSON format'}
+            await loop.sock_sendall(conn, pack_frame(MSG_JSON, orjson.dumps(response)))
+    
+    async def handle_client(self, conn, addr):
         """处理客户端连接"""
         print(f"Connected by {addr}")
+        loop = asyncio.get_running_loop()
+        # 每个连接复用同一组收发缓冲区
+        recv_buf = bytearray(MAX_PAYLOAD)
+        recv_view = memoryview(recv_buf)
+        response_buf = bytearray(RESULT_FRAME_MAX)
+        response_view = memoryview(response_buf)
         try:
             while self.running:
-                # 接收客户端数据
-                data = conn.recv(4096)
-                if not data:
+                # 接收帧头
+                if not await self.recv_exactly(conn, recv_view, HEADER.size):
+                    break
+                msg_type, length = HEADER.unpack_from(recv_buf)
+                if length > MAX_PAYLOAD:
+                    print(f"Frame from {addr} too large: type={msg_type}, length={length}")
                     break
                 
-                try:
-                    # 解析JSON数据
-                    received_data = json.loads(data.decode('utf-8'))
-                    print(f"Received from {addr}: {received_data}")
+                # 接收负载（复用同一缓冲区）
+                if not await self.recv_exactly(conn, recv_view, length):
+                    break
+                
+                if msg_type == MSG_JOINT_DATA and length == JOINT_DATA.size:
+                    # 帧序号之后，前12个为关节位置，后12个为关节速度
+                    joint_data = JOINT_DATA.unpack_from(recv_buf)
+                    seq = joint_data[0]
+                    # 碰撞检测耗时远小于1ms，直接在事件循环中执行
+                    self.update_joints(joint_data[1:13], joint_data[13:])
+                    detection = self.check_collision()
                     
-                    # 检查消息类型
-                    if received_data.get('type') == 'joint_data':
-                        # 更新关节状态并检测碰撞
-                        joint_positions = received_data['joint_positions']
-                        joint_velocities = received_data['joint_velocities']
-                        
-                        self.update_joints(joint_positions, joint_velocities)
-                        collision_result = self.check_collision()
-                        
-                        # 发送碰撞检测结果
-                        response = {
-                            'type': 'collision_result',
-                            'result': collision_result
-                        }
-                        conn.sendall(json.dumps(response).encode('utf-8'))
-                        
-                    elif received_data.get('type') == 'ping':
-                        # 心跳检测
-                        response = {'type': 'pong'}
-                        conn.sendall(json.dumps(response).encode('utf-8'))
-                        
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {str(e)}")
-                    response = {'error': 'Invalid JSON format'}
-                    conn.sendall(json.dumps(response).encode('utf-8'))
+                    # 发送碰撞检测结果（回传帧序号），检测失败时以状态字段告知客户端
+                    if detection is None:
+                        n = pack_collision_result_into(response_buf, seq, False, [], 0.0, RESULT_ERROR)
+                    else:
+                        result, collider_pair_list, distance = detection
+                        n = pack_collision_result_into(response_buf, seq, result, collider_pair_list, distance)
+                    await loop.sock_sendall(conn, response_view[:n])
+                elif msg_type == MSG_JSON:
+                    await self.handle_json_message(conn, addr, recv_view[:length])
+                else:
+                    print(f"Unknown message from {addr}: type={msg_type}, length={length}")
                 
         except Exception as e:
             print(f"Error handling client {addr}: {str(e)}")
@@ -410,27 +518,46 @@ class CollisionDetectionServer:
             conn.close()
             print(f"Connection with {addr} closed")
     
+    @staticmethod
+    def configure_client_socket(conn):
+        """设置控制周期连接的套接字选项"""
+        # 关闭Nagle算法，小帧立即发送，避免与延迟ACK叠加产生的等待
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # 开启TCP保活，及时发现已断开的客户端
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # 每帧不足1KB，使用较小的收发缓冲区
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024)
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 8 * 1024)
+    
+    async def serve(self):
+        """在单个事件循环中接受并服务所有客户端连接"""
+        loop = asyncio.get_running_loop()
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.host, self.port))
+        self.server_socket.listen(5)
+        self.server_socket.setblocking(False)
+        self.running = True
+        
+        print(f"Collision detection server started on {self.host}:{self.port}")
+        
+        while self.running:
+            try:
+                conn, addr = await loop.sock_accept(self.server_socket)
+                conn.setblocking(False)
+                self.configure_client_socket(conn)
+                # 保留任务引用，避免连接处理中途被回收
+                task = loop.create_task(self.handle_client(conn, addr))
+                self.client_tasks.add(task)
+                task.add_done_callback(self.client_tasks.discard)
+            except Exception as e:
+                if self.running:
+                    print(f"Error accepting connection: {str(e)}")
+    
     def start(self):
         """启动服务器"""
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
-            self.running = True
-            
-            print(f"Collision detection server started on {self.host}:{self.port}")
-            
-            while self.running:
-                try:
-                    conn, addr = self.server_socket.accept()
-                    client_thread = threading.Thread(target=self.handle_client, args=(conn, addr))
-                    client_thread.daemon = True
-                    client_thread.start()
-                except Exception as e:
-                    if self.running:
-                        print(f"Error accepting connection: {str(e)}")
-            
+            asyncio.run(self.serve())
         except Exception as e:
             print(f"Server error: {str(e)}")
             traceback.print_exc()
@@ -448,6 +575,7 @@ class CollisionDetectionServer:
         print("Collision detection server stopped")
 
 if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s [%(levelname)s] %(message)s')
     server = CollisionDetectionServer()
     try:
         server.start()
@@ -0,0 +1,67 @@
+"""碰撞检测服务端与客户端之间的二进制帧格式
+
+帧结构：[u8 消息类型][u32 负载长度][负载]，全部为小端字节序。
+"""
+import struct
+from typing import List, Tuple
+
+# 帧头：消息类型 + 负载长度
+HEADER = struct.Struct("<BI")
+
+# 消息类型
+MSG_JOINT_DATA = 1          # 客户端 -> 服务端：关节数据
+MSG_COLLISION_RESULT = 2    # 服务端 -> 客户端：碰撞检测结果
+MSG_JSON = 3                # 双向：UTF-8编码的JSON消息（心跳等）
+
+# 关节数据负载：帧序号(u16) + 12个关节位置（弧度） + 12个关节速度（度/秒）
+JOINT_DATA = struct.Struct("<H24d")
+# 含帧头的完整关节数据帧
+JOINT_FRAME = struct.Struct("<BIH24d")
+
+# 碰撞检测结果负载：帧序号(u16，回传请求的序号) + 检测状态(u8) + 碰撞标志(u8) + 碰撞对数量(i32)
+#                 + 碰撞对ID(i32 * n) + 最小距离(f64)
+RESULT_HEAD = struct.Struct("<HBBi")
+RESULT_DIST = struct.Struct("<d")
+
+# 检测状态：RESULT_ERROR表示服务端碰撞检测失败，此时碰撞标志与距离无意义，客户端应按不安全处理
+RESULT_OK = 0
+RESULT_ERROR = 1
+
+# 接收缓冲区大小，即单帧负载长度上限
+MAX_PAYLOAD = 8192
+
+# 单帧碰撞检测结果中碰撞对ID的最大数量，用于预分配发送缓冲区
+MAX_RESULT_PAIRS = 32
+RESULT_FRAME_MAX = HEADER.size + RESULT_HEAD.size + 4 * MAX_RESULT_PAIRS + RESULT_DIST.size
+
+
+def pack_frame(msg_type: int, payload: bytes) -> bytes:
+    """为负载加上帧头"""
+    return HEADER.pack(msg_type, len(payload)) + payload
+
+
+def pack_collision_result_into(buf: bytearray, seq: int, collision_detected: bool,
+                               colliding_pairs: List[int], min_distance: float,
+                               status: int = RESULT_OK) -> int:
+    """将碰撞检测结果帧（含帧头）写入预分配的缓冲区，返回帧长度"""
+    n = len(colliding_pairs)
+    if n > MAX_RESULT_PAIRS:
+        raise ValueError(f"碰撞对数量超出上限: {n} > {MAX_RESULT_PAIRS}")
+    offset = HEADER.size
+    RESULT_HEAD.pack_into(buf, offset, seq, status, bool(collision_detected), n)
+    offset += RESULT_HEAD.size
+    struct.pack_into(f"<{n}i", buf, offset, *colliding_pairs)
+    offset += 4 * n
+    RESULT_DIST.pack_into(buf, offset, min_distance)
+    offset += RESULT_DIST.size
+    HEADER.pack_into(buf, 0, MSG_COLLISION_RESULT, offset - HEADER.size)
+    return offset
+
+
+def unpack_collision_result(payload) -> Tuple[int, int, bool, Tuple[int, ...], float]:
+    """解析碰撞检测结果负载，返回(帧序号, 检测状态, 是否碰撞, 碰撞对ID, 最小距离)"""
+    seq, status, collision_detected, n = RESULT_HEAD.unpack_from(payload)
+    offset = RESULT_HEAD.size
+    colliding_pairs = struct.unpack_from(f"<{n}i", payload, offset)
+    min_distance, = RESULT_DIST.unpack_from(payload, offset + 4 * n)
+    return seq, status, bool(collision_detected), colliding_pairs, min_distance
@@ -1,4 +1,6 @@
 import json
+import os
+import numpy as np
 from typing import List, Dict, Any
 
 class RobotType:
@@ -43,51 +45,95 @@ class CollisionModelIndex:
     R_Tool2 = 17
 
 
-# 基础碰撞模型结构体（对应C++的struct）
-class BallModel:
-    def __init__(self):
-        self.offset: List[float] = []  # 三维偏移向量 [x, y, z]
-        self.radius: float = 0.0       # 球体半径
-        self.type: str = ""            # 模型类型标识
+class CapsuleSlot:
+    """胶囊体在capsule_*数组中的行号"""
+    L_base = 0
+    L_lowerArm = 1
+    L_elbow = 2
+    L_upperArm = 3
+    R_base = 4
+    R_lowerArm = 5
+    R_elbow = 6
+    R_upperArm = 7
 
 
-class CapsuleModel:
-    def __init__(self):
-        self.start: List[float] = []   # 起点坐标 [x1, y1, z1]
-        self.end: List[float] = []     # 终点坐标 [x2, y2, z2]
-        self.radius: float = 0.0       # 胶囊体半径
-        self.type: str = ""            # 模型类型标识
+class BallSlot:
+    """球体在ball_*数组中的行号"""
+    L_wrist = 0
+    R_wrist = 1
 
 
-class LozengeModelCo:
-    def __init__(self):
-        self.ref2local_frame: List[float] = []  # 参考系到局部坐标系的转换参数
-        self.offset: List[float] = []          # 三维偏移向量 [x, y, z]
-        self.geometry: List[float] = []        # 几何参数 [长, 宽, 高, 半径]
-        self.type: str = ""                    # 模型类型标识
+class LozengeSlot:
+    """棱体在lozenges数组中的行号"""
+    platform = 0
+    truck = 1
+    head = 2
 
 
 class DualArmColliderConfiguration:
-    """双臂机器人碰撞配置结构体"""
+    """双臂机器人碰撞配置结构体（同类碰撞体参数连续存放）"""
     def __init__(self):
-        self.dh: List[float] = []                  # DH参数（运动学建模）
-        self.robType: int = RobotType.DualArm      # 机器人类型（默认为双臂）
-        # 主体结构（棱体模型）
-        self.platform: LozengeModelCo = LozengeModelCo()  # 平台
-        self.truck: LozengeModelCo = LozengeModelCo()      # 躯干
-        self.head: LozengeModelCo = LozengeModelCo()       # 头部
-        # 左臂部件（胶囊体/球体模型）
-        self.L_base: CapsuleModel = CapsuleModel()         # 左臂底座
-        self.L_lowerArm: CapsuleModel = CapsuleModel()     # 左臂下臂
-        self.L_elbow: CapsuleModel = CapsuleModel()        # 左臂肘部
-        self.L_upperArm: CapsuleModel = CapsuleModel()     # 左臂上臂
-        self.L_wrist: BallModel = BallModel()              # 左臂腕部（球体）
-        # 右臂部件（胶囊体/球体模型）
-        self.R_base: CapsuleModel = CapsuleModel()         # 右臂底座
-        self.R_lowerArm: CapsuleModel = CapsuleModel()     # 右臂下臂
-        self.R_elbow: CapsuleModel = CapsuleModel()        # 右臂肘部
-        self.R_upperArm: CapsuleModel = CapsuleModel()     # 右臂上臂
-        self.R_wrist: BallModel = BallModel()              # 右臂腕部（球体）
+        self.dh: np.ndarray = np.zeros(4)                  # DH参数 [d1, d4, d6, a2]
+        self.robType: int = RobotType.DualArm              # 机器人类型（默认为双臂）
+        # 主体结构（棱体模型），每行：ref2local_frame(6) + geometry(4) + offset(3)
+        self.lozenges: np.ndarray = np.zeros((3, 13))
+        # 左右臂胶囊体模型（底座/下臂/肘部/上臂），行号见CapsuleSlot
+        self.capsule_starts: np.ndarray = np.zeros((8, 3))  # 起点坐标
+        self.capsule_ends: np.ndarray = np.zeros((8, 3))    # 终点坐标
+        self.capsule_radii: np.ndarray = np.zeros(8)        # 胶囊体半径
+        # 左右臂腕部球体模型，行号见BallSlot
+        self.ball_offsets: np.ndarray = np.zeros((2, 3))    # 三维偏移向量
+        self.ball_radii: np.ndarray = np.zeros(2)           # 球体半径
+
+
+# JSON字段名与配置数组行号的对应关系
+LOZENGE_FIELDS = [
+    ("platform", LozengeSlot.platform),      # 平台
+    ("truck", LozengeSlot.truck),            # 躯干
+    ("head", LozengeSlot.head),              # 头部
+]
+
+# 左右臂底座共用JSON中的"base"字段（init_dual_arm只接收一组底座参数）
+CAPSULE_FIELDS = [
+    ("base", CapsuleSlot.L_base),            # 左臂底座
+    ("l_lowerArm", CapsuleSlot.L_lowerArm),  # 左臂下臂
+    ("l_elbow", CapsuleSlot.L_elbow),        # 左臂肘部
+    ("l_upperArm", CapsuleSlot.L_upperArm),  # 左臂上臂
+    ("base", CapsuleSlot.R_base),            # 右臂底座
+    ("r_lowerArm", CapsuleSlot.R_lowerArm),  # 右臂下臂
+    ("r_elbow", CapsuleSlot.R_elbow),        # 右臂肘部
+    ("r_upperArm", CapsuleSlot.R_upperArm),  # 右臂上臂
+]
+
+BALL_FIELDS = [
+    ("l_wrist", BallSlot.L_wrist),           # 左臂腕部
+    ("r_wrist", BallSlot.R_wrist),           # 右臂腕部
+]
+
+
+def _fill(dst: np.ndarray, values: List[float]) -> None:
+    """将JSON数组写入定长数组，超出部分截断，不足部分补0"""
+    n = min(len(dst), len(values))
+    dst[:n] = values[:n]
+    dst[n:] = 0.0
+
+
+def _read_lozenge(data: Dict[str, Any], config: DualArmColliderConfiguration, slot: int) -> None:
+    row = config.lozenges[slot]
+    _fill(row[0:6], data.get("ref2local_frame", []))
+    _fill(row[6:10], data.get("geometry", []))
+    _fill(row[10:13], data.get("offset", []))
+
+
+def _read_capsule(data: Dict[str, Any], config: DualArmColliderConfiguration, slot: int) -> None:
+    _fill(config.capsule_starts[slot], data.get("start", []))
+    _fill(config.capsule_ends[slot], data.get("end", []))
+    config.capsule_radii[slot] = data.get("radius", 0.0)
+
+
+def _read_ball(data: Dict[str, Any], config: DualArmColliderConfiguration, slot: int) -> None:
+    _fill(config.ball_offsets[slot], data.get("offset", []))
+    config.ball_radii[slot] = data.get("radius", 0.0)
 
 
 def read_dual_arm_self_collision_model_from_json(file_path: str, config: DualArmColliderConfiguration) -> None:
@@ -103,106 +149,67 @@ def read_dual_arm_self_collision_model_from_json(file_path: str, config: DualArm
             config.robType = RobotType.DualArm
             # 解析DH参数
             dh_data = json_data.get("DH", {})
-            config.dh = [
+            config.dh[:] = [
                 dh_data.get("d1", 0.0),
                 dh_data.get("d4", 0.0),
                 dh_data.get("d6", 0.0),
                 dh_data.get("a2", 0.0)
             ]
 
-        # 解析主体棱体模型（platform/truck/head）
-        # 平台（LozengeModel_co）
-        platform_data = json_data.get("platform", {})
-        config.platform.ref2local_frame = platform_data.get("ref2local_frame", [])
-        config.platform.geometry = platform_data.get("geometry", [])
-        config.platform.offset = platform_data.get("offset", [])
-        config.platform.type = platform_data.get("type", "")
-
-        # 躯干（LozengeModel_co）
-        truck_data = json_data.get("truck", {})
-        config.truck.ref2local_frame = truck_data.get("ref2local_frame", [])
-        config.truck.geometry = truck_data.get("geometry", [])
-        config.truck.offset = truck_data.get("offset", [])
-        config.truck.type = truck_data.get("type", "")
-
-        # 头部（LozengeModel_co）
-        head_data = json_data.get("head", {})
-        config.head.ref2local_frame = head_data.get("ref2local_frame", [])
-        config.head.geometry = head_data.get("geometry", [])
-        config.head.offset = head_data.get("offset", [])
-        config.head.type = head_data.get("type", "")
-
-        # 解析左臂胶囊体/球体模型
-        # 左臂底座（CapsuleModel）
-        l_base_data = json_data.get("base", {})  # 对应JSON中的"l_base"字段
-        config.L_base.start = l_base_data.get("start", [])
-        config.L_base.end = l_base_data.get("end", [])
-        config.L_base.radius = l_base_data.get("radius", 0.0)
-        config.L_base.type = l_base_data.get("type", "")
-
-        # 左臂下臂（CapsuleModel）
-        l_lower_arm_data = json_data.get("l_lowerArm", {})
-        config.L_lowerArm.start = l_lower_arm_data.get("start", [])
-        config.L_lowerArm.end = l_lower_arm_data.get("end", [])
-        config.L_lowerArm.radius = l_lower_arm_data.get("radius", 0.0)
-        config.L_lowerArm.type = l_lower_arm_data.get("type", "")
-
-        # 左臂肘部（CapsuleModel）
-        l_elbow_data = json_data.get("l_elbow", {})
-        config.L_elbow.start = l_elbow_data.get("start", [])
-        config.L_elbow.end = l_elbow_data.get("end", [])
-        config.L_elbow.radius = l_elbow_data.get("radius", 0.0)
-        config.L_elbow.type = l_elbow_data.get("type", "")
-
-        # 左臂上臂（CapsuleModel）
-        l_upper_arm_data = json_data.get("l_upperArm", {})
-        config.L_upperArm.start = l_upper_arm_data.get("start", [])
-        config.L_upperArm.end = l_upper_arm_data.get("end", [])
-        config.L_upperArm.radius = l_upper_arm_data.get("radius", 0.0)
-        config.L_upperArm.type = l_upper_arm_data.get("type", "")
-
-        # 左臂腕部（BallModel）
-        l_wrist_data = json_data.get("l_wrist", {})
-        config.L_wrist.offset = l_wrist_data.get("offset", [])
-        config.L_wrist.radius = l_wrist_data.get("radius", 0.0)
-        config.L_wrist.type = l_wrist_data.get("type", "")
-
-        # 解析右臂胶囊体/球体模型
-        # 右臂底座（CapsuleModel）
-        r_base_data = json_data.get("base", {})
-        config.R_base.start = r_base_data.get("start", [])
-        config.R_base.end = r_base_data.get("end", [])
-        config.R_base.radius = r_base_data.get("radius", 0.0)
-        config.R_base.type = r_base_data.get("type", "")
-
-        # 右臂下臂（CapsuleModel）
-        r_lower_arm_data = json_data.get("r_lowerArm", {})
-        config.R_lowerArm.start = r_lower_arm_data.get("start", [])
-        config.R_lowerArm.end = r_lower_arm_data.get("end", [])
-        config.R_lowerArm.radius = r_lower_arm_data.get("radius", 0.0)
-        config.R_lowerArm.type = r_lower_arm_data.get("type", "")
-
-        # 右臂肘部（CapsuleModel）
-        r_elbow_data = json_data.get("r_elbow", {})
-        config.R_elbow.start = r_elbow_data.get("start", [])
-        config.R_elbow.end = r_elbow_data.get("end", [])
-        config.R_elbow.radius = r_elbow_data.get("radius", 0.0)
-        config.R_elbow.type = r_elbow_data.get("type", "")
-
-        # 右臂上臂（CapsuleModel）
-        r_upper_arm_data = json_data.get("r_upperArm", {})
-        config.R_upperArm.start = r_upper_arm_data.get("start", [])
-        config.R_upperArm.end = r_upper_arm_data.get("end", [])
-        config.R_upperArm.radius = r_upper_arm_data.get("radius", 0.0)
-        config.R_upperArm.type = r_upper_arm_data.get("type", "")
-
-        # 右臂腕部（BallModel）
-        r_wrist_data = json_data.get("r_wrist", {})
-        config.R_wrist.offset = r_wrist_data.get("offset", [])
-        config.R_wrist.radius = r_wrist_data.get("radius", 0.0)
-        config.R_wrist.type = r_wrist_data.get("type", "")
+        # 解析主体棱体模型及左右臂胶囊体/球体模型
+        for key, slot in LOZENGE_FIELDS:
+            _read_lozenge(json_data.get(key, {}), config, slot)
+        for key, slot in CAPSULE_FIELDS:
+            _read_capsule(json_data.get(key, {}), config, slot)
+        for key, slot in BALL_FIELDS:
+            _read_ball(json_data.get(key, {}), config, slot)
 
     except FileNotFoundError:
         raise RuntimeError(f"无法打开文件: {file_path}")
     except Exception as e:
-        raise RuntimeError(f"JSON解析错误: {str(e)}")
\ No newline at end of file
+        raise RuntimeError(f"JSON解析错误: {str(e)}")
+
+
+# 缓存中保存的配置数组字段
+CACHE_ARRAY_FIELDS = ("dh", "lozenges", "capsule_starts", "capsule_ends",
+                      "capsule_radii", "ball_offsets", "ball_radii")
+# 缓存格式版本，字段或槽位布局变化时递增，旧版本的缓存不再使用
+CACHE_FORMAT_VERSION = 1
+
+
+def save_collision_model_cache(cache_path: str, config: DualArmColliderConfiguration, source_mtime: float) -> None:
+    """将解析后的碰撞配置保存为npz缓存，并记录缓存格式版本和源JSON文件的修改时间"""
+    arrays = {name: getattr(config, name) for name in CACHE_ARRAY_FIELDS}
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, format_version=CACHE_FORMAT_VERSION, source_mtime=source_mtime,
+                     rob_type=config.robType, **arrays)
+        # 先写临时文件再替换，避免中途退出留下不完整的缓存
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        # 写入或替换失败时清理临时文件
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_collision_model_cache(cache_path: str, config: DualArmColliderConfiguration, source_mtime: float) -> bool:
+    """缓存格式版本和源JSON文件修改时间均一致时从缓存填充碰撞配置，返回是否命中缓存"""
+    if not os.path.exists(cache_path):
+        return False
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if "format_version" not in data.files or int(data["format_version"]) != CACHE_FORMAT_VERSION:
+                return False
+            if float(data["source_mtime"]) != source_mtime:
+                return False
+            config.robType = int(data["rob_type"])
+            for name in CACHE_ARRAY_FIELDS:
+                getattr(config, name)[...] = data[name]
+        return True
+    except Exception as e:
+        print(f"读取碰撞配置缓存失败: {str(e)}，将重新解析JSON文件")
+        return False
@@ -1,15 +1,77 @@
 #!/usr/bin/env python3
 import socket
+import asyncio
 import json
 import time
+import logging
+import logging.handlers
+import queue
 import threading
 import sys
 import os
 import math
-from typing import List, Optional
+import struct
+import numpy as np
+from typing import Optional, Tuple
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../robot_control/scripts'))
 from CPS import CPSClient
+from collision_protocol import (
+    HEADER,
+    JOINT_DATA,
+    JOINT_FRAME,
+    MAX_PAYLOAD,
+    MSG_COLLISION_RESULT,
+    MSG_JOINT_DATA,
+    MSG_JSON,
+    RESULT_OK,
+    pack_frame,
+    unpack_collision_result
+)
+
+# 角度转弧度系数
+DEG2RAD = math.pi / 180.0
+# 关节数据帧中的帧序号字段
+JOINT_SEQ = struct.Struct("<H")
+# 与服务器连接的忙轮询时长（微秒），0表示不启用；Python未导出SO_BUSY_POLL时使用Linux的取值46
+BUSY_POLL_USEC = 50
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)
+# 关节状态快照默认的最长有效时间：该数量的后台读取周期（不少于一个发送周期），超过说明后台读取已停滞，不再发送
+STATE_MAX_READ_PERIODS = 5
+# 碰撞检测结果的应答超时：有未应答的帧且超过该周期数（不少于REPLY_TIMEOUT_MIN秒）未收到任何结果时，
+# 视为服务器失去响应，按碰撞处理并重连
+REPLY_TIMEOUT_PERIODS = 10
+REPLY_TIMEOUT_MIN = 0.1
+# 心跳发出后等待应答的最长时间（秒）
+PONG_TIMEOUT = 2.0
+# 后台读取线程两轮之间的最短休眠（秒）。读取慢于周期时也让出SDK锁，避免紧接着重新抢占
+READER_MIN_SLEEP = 0.001
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """日志队列已满时直接丢弃记录，不阻塞控制周期"""
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def setup_logging(max_queued: int = 1024) -> logging.handlers.QueueListener:
+    """将客户端日志经有界队列交给后台线程输出，返回已启动的QueueListener"""
+    log_queue = queue.Queue(maxsize=max_queued)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    # CPS模块导入时已为根logger配置了输出，不再向上传递以免重复且同步地输出
+    logger.propagate = False
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
 
 class Arm:
     """机械臂类，封装单个手臂的连接和数据读取功能"""
@@ -21,151 +83,183 @@ class Arm:
         self.sdk = sdk
         self.robot_id = robot_id
         self.connected = False
+        # 关节位置/速度的预分配缓冲区，每次读取时原地覆盖
+        self.pos_buf = np.empty(6, dtype=np.float64)
+        self.vel_buf = np.empty(6, dtype=np.float64)
+        # SDK以字符串列表返回读数（先clear再append），复用同一列表接收
+        self.pos_result = []
+        self.vel_result = []
+        # 每周期调用的SDK读取接口预先绑定，省去每次的属性查找
+        self.sdk_read_pos = sdk.HRIF_ReadActJointPos
+        self.sdk_read_vel = sdk.HRIF_ReadActJointVel
+        # 同一控制箱的SDK连接不能并发使用：读取在后台线程中进行，急停在线程池中进行。
+        # Lock不保证公平，急停前先置位stop_requested，读取线程在每次SDK调用前检查并让出
+        self.sdk_lock = threading.Lock()
+        self.stop_requested = threading.Event()
+        # 后台线程持续读取关节状态，写入双缓冲中的后台缓冲区后整体发布。
+        # published为(关节状态, 读取时刻)，前6个为位置（弧度），后6个为速度（度/秒）；
+        # 元组赋值是原子的，读取方无需加锁
+        self.state_bufs = (np.empty(12, dtype=np.float64), np.empty(12, dtype=np.float64))
+        self.published = (None, 0.0)
+        self.reader_thread = None
+        self.reader_running = False
         
     def connect(self) -> bool:
         """连接机械臂"""
         try:
             is_connected = self.sdk.HRIF_IsConnected(self.boxid)
             if is_connected:
-                print(f"{self.arm_type}已处于连接状态 (boxid: {self.boxid})")
+                logger.info("%s已处于连接状态 (boxid: %s)", self.arm_type, self.boxid)
                 self.connected = True
                 return True
             
-            print(f"开始连接{self.arm_type} (boxid: {self.boxid}, ip: {self.ip}, port: {self.port})")
+            logger.info("开始连接%s (boxid: %s, ip: %s, port: %s)", self.arm_type, self.boxid, self.ip, self.port)
             ret = self.sdk.HRIF_Connect(self.boxid, self.ip, self.port)
             
             if ret != 0:
-                print(f"{self.arm_type}连接失败 (错误码: {ret})")
-                self.connected = False
-                return False
-            
-            if not self.sdk.HRIF_IsConnected(self.boxid):
-                print(f"{self.arm_type}连接返回成功，但HRIF_IsConnected验证失败")
+                logger.error("%s连接失败 (错误码: %s)", self.arm_type, ret)
                 self.connected = False
                 return False
             
-            print(f"{self.arm_type}连接成功 (boxid: {self.boxid}, ip: {self.ip})")
+            logger.info("%s连接成功 (boxid: %s, ip: %s)", self.arm_type, self.boxid, self.ip)
             self.connected = True
             return True
         
         except Exception as e:
-            print(f"{self.arm_type}连接过程异常: {str(e)}")
+            logger.error("%s连接过程异常: %s", self.arm_type, e)
             self.connected = False
             return False
     
-    # def read_joint_positions(self) -> Optional[List[float]]:
-    #     """读取6个关节位置并转换为弧度"""
-    #     if not self.connected:
-    #         print(f"{self.arm_type}未连接，无法读取关节位置")
-    #         return None
-            
-    #     try:
-    #         result = []
-    #         ret = self.sdk.HRIF_ReadActJointPos(self.boxid, self.robot_id, result)
-            
-    #         if ret != 0:
-    #             print(f"{self.arm_type}读取关节位置失败，返回码: {ret}")
-    #             return None
-                
-    #         if len(result) != 6:
-    #             print(f"{self.arm_type}关节位置数量不正确，期望6个，实际{len(result)}个")
-    #             return None
-            
-    #         # 将字符串转换为浮点数，然后从度转换为弧度
-    #         try:
-    #             positions_degrees = [float(pos) for pos in result]
-    #             positions_radians = [math.radians(pos) for pos in positions_degrees]
-    #             return positions_radians
-    #         except ValueError as e:
-    #             print(f"{self.arm_type}位置数据转换错误: {str(e)}")
-    #             return None
-                
-    #     except Exception as e:
-    #         print(f"{self.arm_type}读取关节位置异常: {str(e)}")
-    #         return None
-    
-    def read_joint_positions(self) -> Optional[List[float]]:
-        """读取6个关节位置并转换为弧度"""
+    def read_joints(self, sdk_read, result: list, out: np.ndarray, label: str,
+                    scale: float = 1.0, offset0: float = 0.0) -> Optional[np.ndarray]:
+        """读取6个关节数据写入out（读数乘以scale，第一个关节再加offset0），返回的缓冲区在下一次读取时被覆盖"""
         if not self.connected:
-            print(f"{self.arm_type}未连接，无法读取关节位置")
+            logger.warning("%s未连接，无法读取关节%s", self.arm_type, label)
             return None
             
         try:
-            result = []
-            ret = self.sdk.HRIF_ReadActJointPos(self.boxid, self.robot_id, result)
+            ret = sdk_read(self.boxid, self.robot_id, result)
             
             if ret != 0:
-                print(f"{self.arm_type}读取关节位置失败，返回码: {ret}")
+                logger.error("%s读取关节%s失败，返回码: %s", self.arm_type, label, ret)
                 return None
                 
             if len(result) != 6:
-                print(f"{self.arm_type}关节位置数量不正确，期望6个，实际{len(result)}个")
+                logger.error("%s关节%s数量不正确，期望6个，实际%s个", self.arm_type, label, len(result))
                 return None
             
-            # 将字符串转换为浮点数，然后从度转换为弧度
+            # 将字符串转换为浮点数
             try:
-                positions_degrees = [float(pos) for pos in result]
-                positions_radians = [math.radians(pos) for pos in positions_degrees]
-                
-                # 对第一个关节（joint1）加180度（π弧度）
-                positions_radians[0] += math.pi
-                
-                return positions_radians
+                out[:] = result
             except ValueError as e:
-                print(f"{self.arm_type}位置数据转换错误: {str(e)}")
+                logger.error("%s%s数据转换错误: %s", self.arm_type, label, e)
                 return None
+            
+            if scale != 1.0:
+                out *= scale
+            if offset0:
+                out[0] += offset0
+            return out
                 
         except Exception as e:
-            print(f"{self.arm_type}读取关节位置异常: {str(e)}")
+            logger.error("%s读取关节%s异常: %s", self.arm_type, label, e)
             return None
     
-    def read_joint_velocities(self) -> Optional[List[float]]:
+    def read_joint_positions(self) -> Optional[np.ndarray]:
+        """读取6个关节位置并转换为弧度，第一个关节（joint1）加180度（π弧度）"""
+        return self.read_joints(self.sdk_read_pos, self.pos_result, self.pos_buf, "位置", DEG2RAD, math.pi)
+    
+    def read_joint_velocities(self) -> Optional[np.ndarray]:
         """读取6个关节速度（保持度/秒单位）"""
-        if not self.connected:
-            print(f"{self.arm_type}未连接，无法读取关节速度")
+        return self.read_joints(self.sdk_read_vel, self.vel_result, self.vel_buf, "速度")
+    
+    def read_state(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """依次读取关节位置（弧度）和关节速度（度/秒），读取失败或让位于急停时对应项为None"""
+        positions = self.locked_read(self.read_joint_positions)
+        if positions is None:
+            return None, None
+        return positions, self.locked_read(self.read_joint_velocities)
+    
+    def locked_read(self, read):
+        """持SDK锁执行一次读取；有急停等待时不再抢锁，直接返回None。
+        每次SDK调用单独加锁，急停至多等待正在进行的一次读取"""
+        if self.stop_requested.is_set():
             return None
+        with self.sdk_lock:
+            return read()
+    
+    def start_reader(self, rate: float):
+        """启动后台线程，以rate频率持续读取并发布关节状态"""
+        if self.reader_thread is not None:
+            return
+        self.reader_running = True
+        self.reader_thread = threading.Thread(target=self.reader_loop, args=(1.0 / rate,),
+                                              name=f"{self.arm_type}_reader", daemon=True)
+        self.reader_thread.start()
+    
+    def stop_reader(self):
+        """停止后台读取线程"""
+        self.reader_running = False
+        if self.reader_thread is not None:
+            self.reader_thread.join(timeout=1.0)
+            self.reader_thread = None
+    
+    def reader_loop(self, period: float):
+        """后台读取循环：读取成功后写入未发布的缓冲区，再与已发布的缓冲区交换"""
+        back = 0
+        next_tick = time.monotonic()
+        while self.reader_running and self.connected:
+            positions, velocities = self.read_state()
+            if positions is not None and velocities is not None:
+                state = self.state_bufs[back]
+                state[:6] = positions
+                state[6:] = velocities
+                self.published = (state, time.monotonic())
+                # 下次写入另一块缓冲区。两次发布之间至少隔一次SDK往返（毫秒级），
+                # 读取方复制12个数（微秒级）期间已发布的缓冲区不会被改写
+                back = 1 - back
             
-        try:
-            result = []
-            ret = self.sdk.HRIF_ReadActJointVel(self.boxid, self.robot_id, result)
-            
-            if ret != 0:
-                print(f"{self.arm_type}读取关节速度失败，返回码: {ret}")
-                return None
-                
-            if len(result) != 6:
-                print(f"{self.arm_type}关节速度数量不正确，期望6个，实际{len(result)}个")
-                return None
-            
-            # 将字符串转换为浮点数（速度单位保持度/秒）
-            try:
-                velocities = [float(vel) for vel in result]
-                return velocities
-            except ValueError as e:
-                print(f"{self.arm_type}速度数据转换错误: {str(e)}")
-                return None
-                
-        except Exception as e:
-            print(f"{self.arm_type}读取关节速度异常: {str(e)}")
-            return None
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay < READER_MIN_SLEEP:
+                delay = READER_MIN_SLEEP
+                next_tick = time.monotonic() + delay
+            time.sleep(delay)
+    
+    def latest_state(self) -> Tuple[Optional[np.ndarray], float]:
+        """返回最近发布的关节状态及其读取时刻，尚未读取成功时关节状态为None"""
+        return self.published
     
     def group_stop(self) -> bool:
         """急停机械臂"""
         try:
-            nRet = self.sdk.HRIF_GrpStop(self.boxid, self.robot_id)
+            self.stop_requested.set()
+            try:
+                with self.sdk_lock:
+                    nRet = self.sdk.HRIF_GrpStop(self.boxid, self.robot_id)
+            finally:
+                self.stop_requested.clear()
             if nRet != 0:
-                print(f"{self.arm_type}急停失败 (错误码: {nRet})")
+                logger.error("%s急停失败 (错误码: %s)", self.arm_type, nRet)
                 return False
-            print(f"{self.arm_type}急停成功")
+            logger.info("%s急停成功", self.arm_type)
             return True
         except Exception as e:
-            print(f"{self.arm_type}急停过程异常: {str(e)}")
+            logger.error("%s急停过程异常: %s", self.arm_type, e)
             return False
 
 class RobotArmClient:
-    def __init__(self, server_host='192.168.1.8', server_port=9092):
+    def __init__(self, server_host='192.168.1.8', server_port=9092, batch_size=1, read_rate=200.0,
+                 state_max_age: Optional[float] = None):
         self.server_host = server_host
         self.server_port = server_port
+        # 每次发送合并的关节数据帧数。服务端按顺序逐帧回复结果；大于1时可减少高频控制下的系统调用，
+        # 但前面的帧要等到本批发送时才送出，碰撞检测结果相应延后，默认1保持每周期即时发送
+        self.batch_size = batch_size
+        # 后台读取机械臂关节状态的频率，与发送周期解耦，使发送时总能取到较新的数据
+        self.read_rate = read_rate
+        # 关节状态快照的最长有效时间（秒），为None时由run按读取频率和发送频率计算
+        self.state_max_age = state_max_age
         self.client_socket = None
         self.running = False
         
@@ -186,7 +280,7 @@ class RobotArmClient:
         
         # 初始化CPS客户端
         self.sdk = CPSClient()
-        print("CPS client initialized")
+        logger.info("CPS client initialized")
         
         # 创建左右臂实例
         self.left_arm = Arm(
@@ -212,6 +306,39 @@ class RobotArmClient:
         
         # 碰撞检测标志
         self.collision_detected = False
+        # 线程池中正在执行的急停
+        self.stop_future = None
+        
+        # 关节数据帧序号（u16循环递增），服务端在结果中回传；last_seq为最近一次发送的序号
+        self.seq = 0
+        self.last_seq = None
+        # 预分配batch_size个关节数据帧的发送缓冲区，关节数据直接写入各帧内的24个double
+        self.tx_batch = bytearray(JOINT_FRAME.size * batch_size)
+        self.tx_joints = []
+        for i in range(batch_size):
+            offset = i * JOINT_FRAME.size
+            JOINT_FRAME.pack_into(self.tx_batch, offset, MSG_JOINT_DATA, JOINT_DATA.size, 0, *([0.0] * 24))
+            self.tx_joints.append(np.frombuffer(self.tx_batch, dtype='<f8', count=24,
+                                                offset=offset + HEADER.size + JOINT_SEQ.size))
+        self.tx_view = memoryview(self.tx_batch)
+        # 已写入发送缓冲区、尚未发送的帧数，及其中第一帧的写入时刻。
+        # 未凑满的批次在第一帧写入batch_deadline秒后照常发送（由run按发送周期计算），避免跳过周期后一直滞留
+        self.tx_pending = 0
+        self.tx_first_time = 0.0
+        self.batch_deadline = 0.0
+        # 应答看门狗：已发送但尚未收到结果的帧数、最近一次收到结果（或开始等待）的时刻、
+        # 尚未应答的心跳的发送时刻；reply_timeout由run按发送周期计算
+        self.pending_replies = 0
+        self.last_reply_time = 0.0
+        self.ping_sent_time = None
+        self.reply_timeout = REPLY_TIMEOUT_MIN
+        # 心跳帧内容固定，只打包一次
+        self.ping_frame = pack_frame(MSG_JSON, json.dumps({'type': 'ping'}).encode('utf-8'))
+        # 复用的接收缓冲区
+        self.recv_buf = bytearray(HEADER.size + MAX_PAYLOAD)
+        self.recv_view = memoryview(self.recv_buf)
+        # 接收服务器响应的协程
+        self.receiver_task = None
         
     def connect_arms(self):
         """连接机械臂"""
@@ -219,133 +346,261 @@ class RobotArmClient:
         right_connected = self.right_arm.connect()
         
         if not left_connected and not right_connected:
-            print("左右臂均连接失败，无法继续")
+            logger.error("左右臂均连接失败，无法继续")
             return False
         elif not left_connected:
-            print(f"{self.left_arm.arm_type}连接失败，将尝试仅使用{self.right_arm.arm_type}")
+            logger.warning("%s连接失败，将尝试仅使用%s", self.left_arm.arm_type, self.right_arm.arm_type)
         elif not right_connected:
-            print(f"{self.right_arm.arm_type}连接失败，将尝试仅使用{self.left_arm.arm_type}")
+            logger.warning("%s连接失败，将尝试仅使用%s", self.right_arm.arm_type, self.left_arm.arm_type)
         
         return True
     
-    def connect_to_server(self):
-        """连接到碰撞检测服务器"""
+    async def connect_to_server(self) -> bool:
+        """连接到碰撞检测服务器，并启动接收响应的协程"""
+        loop = asyncio.get_running_loop()
         try:
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client_socket.connect((self.server_host, self.server_port))
-            print(f"Connected to collision detection server at {self.server_host}:{self.server_port}")
+            self.configure_socket(self.client_socket)
+            # 非阻塞套接字，收发均在事件循环中完成
+            self.client_socket.setblocking(False)
+            await loop.sock_connect(self.client_socket, (self.server_host, self.server_port))
+            # 立即确认收到的数据，不等待延迟ACK（仅Linux支持）。连接建立前设置无效，
+            # 且内核可能在之后自行恢复延迟ACK
+            if hasattr(socket, 'TCP_QUICKACK'):
+                self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+            self.receiver_task = loop.create_task(self.receive_replies(self.client_socket))
+            logger.info("Connected to collision detection server at %s:%s", self.server_host, self.server_port)
             return True
         except Exception as e:
-            print(f"Failed to connect to server: {str(e)}")
+            logger.error("Failed to connect to server: %s", e)
             return False
     
-    def send_joint_data(self):
-        """发送关节数据到服务器"""
+    @staticmethod
+    def configure_socket(sock):
+        """设置控制周期连接的套接字选项，需在connect之前调用"""
+        # 关闭Nagle算法，请求帧立即发出
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # 每帧不足1KB，与服务端一致使用较小的收发缓冲区
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 8 * 1024)
+        # 碰撞检测结果在急停的关键路径上：接收时由内核忙轮询网卡，以少量CPU换取更低的接收延迟。
+        # 仅Linux支持，超过net.core.busy_read的取值需要CAP_NET_ADMIN，设置失败时忽略
+        if BUSY_POLL_USEC and sys.platform.startswith('linux'):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, BUSY_POLL_USEC)
+            except OSError as e:
+                logger.info("SO_BUSY_POLL未启用: %s", e)
+    
+    async def receive_replies(self, sock):
+        """持续接收服务器响应帧并在到达时立即处理，不完整的帧保留在缓冲区等待后续数据"""
+        loop = asyncio.get_running_loop()
+        recv_buf = self.recv_buf
+        recv_view = self.recv_view
+        rx_len = 0
+        try:
+            while True:
+                received = await loop.sock_recv_into(sock, recv_view[rx_len:])
+                if not received:
+                    logger.error("服务器已断开连接")
+                    return
+                rx_len += received
+                
+                offset = 0
+                while rx_len - offset >= HEADER.size:
+                    msg_type, length = HEADER.unpack_from(recv_buf, offset)
+                    if length > MAX_PAYLOAD:
+                        logger.error("服务器响应帧过大: %s", length)
+                        return
+                    end = offset + HEADER.size + length
+                    if end > rx_len:
+                        break
+                    # 单帧处理出错（负载格式不正确等）只丢弃该帧，不影响后续帧的接收
+                    try:
+                        self.handle_frame(msg_type, recv_view[offset + HEADER.size:end])
+                    except Exception as e:
+                        logger.error("处理服务器响应帧出错 (type=%s, length=%s): %s", msg_type, length, e)
+                    offset = end
+                
+                # 将剩余的不完整帧移到缓冲区开头
+                if offset:
+                    remaining = rx_len - offset
+                    if remaining:
+                        recv_buf[:remaining] = recv_buf[offset:rx_len]
+                    rx_len = remaining
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error receiving from server: %s", e)
+    
+    def handle_frame(self, msg_type: int, payload: memoryview):
+        """处理服务器发回的一帧响应"""
+        if msg_type == MSG_COLLISION_RESULT:
+            result_seq, status, collision_detected, colliding_pairs, min_distance = unpack_collision_result(payload)
+            if self.pending_replies:
+                self.pending_replies -= 1
+            self.last_reply_time = time.monotonic()
+            # 同一批内的结果按顺序到达，落后超过一批说明响应跟不上发送
+            if (self.last_seq - result_seq) & 0xFFFF >= self.batch_size:
+                logger.warning("收到延迟的碰撞检测结果: 帧序号%s，最新请求%s", result_seq, self.last_seq)
+            if status != RESULT_OK:
+                self.handle_detection_failure(f"服务端碰撞检测失败 (帧序号: {result_seq}, 状态: {status})")
+            else:
+                self.handle_collision_result(collision_detected, colliding_pairs, min_distance)
+        elif msg_type == MSG_JSON:
+            response_data = json.loads(bytes(payload))
+            if response_data.get('type') == 'pong':
+                self.ping_sent_time = None
+                logger.info("Heartbeat received from server")
+        else:
+            logger.warning("Unknown message from server: type=%s, length=%s", msg_type, len(payload))
+    
+    async def send_joint_data(self):
+        """发送关节数据到服务器，碰撞检测结果由receive_replies在到达时处理；接收协程已退出时立即重连"""
+        if self.receiver_task is None or self.receiver_task.done():
+            if self.pending_replies:
+                # 已发出的帧再也收不到结果
+                self.handle_detection_failure(f"与服务器的连接已断开 ({self.pending_replies}帧未应答)")
+            else:
+                logger.error("与服务器的连接已断开，停止发送并重连")
+            await self.reconnect()
+            return False
         try:
-            # 读取左右臂关节位置（已经是弧度）
-            left_pos = self.left_arm.read_joint_positions() if self.left_arm.connected else None
-            right_pos = self.right_arm.read_joint_positions() if self.right_arm.connected else None
+            now = time.monotonic()
+            # 未凑满的批次已到发送期限时先发出，不等本周期的数据
+            if self.tx_pending and now - self.tx_first_time >= self.batch_deadline:
+                await self.flush_batch(now)
             
-            # 读取左右臂关节速度（度/秒）
-            left_vel = self.left_arm.read_joint_velocities() if self.left_arm.connected else None
-            right_vel = self.right_arm.read_joint_velocities() if self.right_arm.connected else None
+            # 取左右臂后台线程最近发布的关节状态，不等待SDK读取
+            left_state, left_time = self.left_arm.latest_state()
+            right_state, right_time = self.right_arm.latest_state()
             
-            # 检查数据完整性
-            if left_pos is None or right_pos is None:
-                print("关节位置数据不完整，跳过本次发送")
+            # 检查数据完整性与时效
+            if left_state is None or right_state is None:
+                logger.warning("关节状态数据不完整，跳过本次发送")
                 return False
-                
-            if left_vel is None or right_vel is None:
-                print("关节速度数据不完整，跳过本次发送")
+            
+            age = now - min(left_time, right_time)
+            if age > self.state_max_age:
+                logger.warning("关节状态数据已过期(%.3fs)，跳过本次发送", age)
                 return False
             
-            # 拼接左右臂数据（左臂6个 + 右臂6个 = 12个）
+            # 按左臂位置、右臂位置、左臂速度、右臂速度的顺序写入本批的下一帧
             # 位置已经是弧度，速度保持度/秒
-            all_pos = left_pos + right_pos
-            all_vel = left_vel + right_vel
-            
-            # 准备发送的数据
-            data = {
-                'type': 'joint_data',
-                'joint_positions': all_pos,  # 弧度
-                'joint_velocities': all_vel,  # 度/秒
-                'units': {
-                    'positions': 'radians',
-                    'velocities': 'degrees_per_second'
-                }
-            }
-            
-            # 发送数据
-            self.client_socket.sendall(json.dumps(data).encode('utf-8'))
+            slot = self.tx_pending
+            joints = self.tx_joints[slot]
+            joints[0:6] = left_state[:6]
+            joints[6:12] = right_state[:6]
+            joints[12:18] = left_state[6:]
+            joints[18:24] = right_state[6:]
             
-            # 接收响应
-            response = self.client_socket.recv(4096)
-            if response:
-                response_data = json.loads(response.decode('utf-8'))
-                if response_data.get('type') == 'collision_result':
-                    result = response_data['result']
-                    self.handle_collision_result(result)
+            # 写入帧序号，凑满一批后一次发送
+            seq = self.seq
+            self.seq = (seq + 1) & 0xFFFF
+            JOINT_SEQ.pack_into(self.tx_batch, slot * JOINT_FRAME.size + HEADER.size, seq)
+            if not slot:
+                self.tx_first_time = now
+            self.tx_pending = slot + 1
+            if self.tx_pending == self.batch_size:
+                await self.flush_batch(now)
             
             return True
             
         except Exception as e:
-            print(f"Error sending joint data: {str(e)}")
+            logger.error("Error sending joint data: %s", e)
             return False
     
-    def handle_collision_result(self, result: dict):
+    async def flush_batch(self, now: float):
+        """发送发送缓冲区中已写入的tx_pending帧"""
+        count = self.tx_pending
+        self.tx_pending = 0
+        self.last_seq = (self.seq - 1) & 0xFFFF
+        # 此前的帧均已应答时，从本次发送开始计算应答超时
+        if not self.pending_replies:
+            self.last_reply_time = now
+        self.pending_replies += count
+        await asyncio.get_running_loop().sock_sendall(self.client_socket, self.tx_view[:count * JOINT_FRAME.size])
+    
+    def handle_collision_result(self, collision_detected: bool, colliding_pairs, min_distance: float):
         """处理碰撞检测结果"""
-        if result.get('collision_detected', False):
-            print(f"碰撞检测到! 碰撞对: {result.get('colliding_pairs', [])}, 最小距离: {result.get('min_distance', 0.0)}")
+        if collision_detected:
+            logger.warning("碰撞检测到! 碰撞对: %s, 最小距离: %s", list(colliding_pairs), min_distance)
             self.collision_detected = True
-            self.emergency_stop()
+            self.request_emergency_stop()
         else:
             self.collision_detected = False
     
+    def handle_detection_failure(self, reason: str):
+        """碰撞检测失败或服务器未按时应答时无法确认安全，按碰撞处理"""
+        logger.error("%s，无法确认安全，执行急停", reason)
+        self.collision_detected = True
+        self.request_emergency_stop()
+    
+    def check_replies(self, now: float) -> bool:
+        """应答看门狗：碰撞检测结果或心跳应答超时时按碰撞处理并返回False，调用方应重连"""
+        if self.pending_replies and now - self.last_reply_time > self.reply_timeout:
+            self.handle_detection_failure(
+                f"{now - self.last_reply_time:.3f}s未收到碰撞检测结果 ({self.pending_replies}帧未应答)")
+            return False
+        if self.ping_sent_time is not None and now - self.ping_sent_time > PONG_TIMEOUT:
+            self.handle_detection_failure(f"心跳{now - self.ping_sent_time:.3f}s未应答")
+            return False
+        return True
+    
+    def request_emergency_stop(self):
+        """在线程池中执行急停，不阻塞事件循环；上一次急停尚未完成时不重复提交"""
+        if self.stop_future is not None and not self.stop_future.done():
+            return
+        self.stop_future = asyncio.get_running_loop().run_in_executor(None, self.emergency_stop)
+    
     def emergency_stop(self):
         """执行急停操作"""
-        print("开始执行双机械臂急停操作...")
+        logger.warning("开始执行双机械臂急停操作...")
         
         # 急停左臂
         if self.left_arm.connected:
             if self.left_arm.group_stop():
-                print(f"{self.left_arm.arm_type}急停成功")
+                logger.info("%s急停成功", self.left_arm.arm_type)
             else:
-                print(f"{self.left_arm.arm_type}急停失败")
+                logger.error("%s急停失败", self.left_arm.arm_type)
         
         # 急停右臂
         if self.right_arm.connected:
             if self.right_arm.group_stop():
-                print(f"{self.right_arm.arm_type}急停成功")
+                logger.info("%s急停成功", self.right_arm.arm_type)
             else:
-                print(f"{self.right_arm.arm_type}急停失败")
+                logger.error("%s急停失败", self.right_arm.arm_type)
         
-        print("双机械臂急停操作完成")
+        logger.warning("双机械臂急停操作完成")
     
-    def send_heartbeat(self):
-        """发送心跳包"""
+    async def send_heartbeat(self):
+        """发送心跳包，响应由receive_replies处理；接收协程已退出说明连接已断开，需要重连"""
+        loop = asyncio.get_running_loop()
         try:
-            data = {'type': 'ping'}
-            self.client_socket.sendall(json.dumps(data).encode('utf-8'))
-            
-            # 接收响应
-            response = self.client_socket.recv(4096)
-            if response:
-                response_data = json.loads(response.decode('utf-8'))
-                if response_data.get('type') == 'pong':
-                    print("Heartbeat received from server")
+            if self.receiver_task is None or self.receiver_task.done():
+                raise ConnectionError("与服务器的连接已断开")
+            await loop.sock_sendall(self.client_socket, self.ping_frame)
+            # 上一个心跳仍未应答时保留其发送时刻，超时从最早未应答的心跳算起
+            if self.ping_sent_time is None:
+                self.ping_sent_time = time.monotonic()
             
         except Exception as e:
-            print(f"Heartbeat error: {str(e)}")
-            self.reconnect()
+            logger.error("Heartbeat error: %s", e)
+            await self.reconnect()
     
-    def reconnect(self):
+    async def reconnect(self):
         """重新连接服务器"""
         self.disconnect()
-        time.sleep(1)
-        self.connect_to_server()
+        await asyncio.sleep(1)
+        await self.connect_to_server()
     
     def disconnect(self):
-        """断开连接"""
+        """断开连接，未发送的批次、未应答的帧和心跳随连接一并作废"""
+        self.tx_pending = 0
+        self.pending_replies = 0
+        self.ping_sent_time = None
+        if self.receiver_task:
+            self.receiver_task.cancel()
+            self.receiver_task = None
         if self.client_socket:
             try:
                 self.client_socket.close()
@@ -353,44 +608,89 @@ class RobotArmClient:
                 pass
             self.client_socket = None
     
-    def start(self, update_rate=10.0):
-        """启动客户端"""
-        if not self.connect_to_server():
+    async def run(self, update_rate: float):
+        """在单个事件循环中按固定周期发送关节数据和心跳"""
+        if not await self.connect_to_server():
             return
         
+        # 已连接的机械臂在后台线程中持续读取关节状态
+        for arm in (self.left_arm, self.right_arm):
+            if arm.connected:
+                arm.start_reader(self.read_rate)
+        
         self.running = True
-        last_heartbeat = time.time()
+        loop = asyncio.get_running_loop()
+        # 循环中用到的方法预先绑定为局部变量，省去每周期的属性查找
+        send_joint_data = self.send_joint_data
+        send_heartbeat = self.send_heartbeat
+        check_replies = self.check_replies
+        # 事件循环时钟为单调时钟，不受系统时间调整影响
+        now = loop.time
+        sleep = asyncio.sleep
+        period = 1.0 / update_rate
+        self.reply_timeout = max(REPLY_TIMEOUT_PERIODS * period, REPLY_TIMEOUT_MIN)
+        if self.state_max_age is None:
+            self.state_max_age = max(STATE_MAX_READ_PERIODS / self.read_rate, period)
+        # 正常情况下一批在batch_size - 1个周期后凑满，再留一个周期的余量
+        self.batch_deadline = self.batch_size * period
+        next_tick = now()
+        last_heartbeat = next_tick
         
         try:
             while self.running:
                 # 发送关节数据
-                self.send_joint_data()
+                await send_joint_data()
+                
+                # 服务器失去响应时已按碰撞处理，断开并重连
+                if not check_replies(time.monotonic()):
+                    await self.reconnect()
                 
                 # 定期发送心跳
-                if time.time() - last_heartbeat > 5.0:
-                    self.send_heartbeat()
-                    last_heartbeat = time.time()
+                if now() - last_heartbeat > 5.0:
+                    await send_heartbeat()
+                    last_heartbeat = now()
                 
-                # 控制更新频率
-                time.sleep(1.0 / update_rate)
+                # 控制更新频率：休眠到下一个周期起点，避免每周期的处理耗时累积成漂移
+                next_tick += period
+                delay = next_tick - now()
+                if delay > 0:
+                    await sleep(delay)
+                else:
+                    # 已落后于计划（如重连耗时），从当前时刻重新计时，不补发积压的周期
+                    next_tick = now()
                 
-        except KeyboardInterrupt:
-            print("\nShutting down client...")
         except Exception as e:
-            print(f"Client error: {str(e)}")
+            logger.error("Client error: %s", e)
+        finally:
+            # 等待线程池中尚未完成的急停，事件循环关闭后急停结果无法回传
+            if self.stop_future is not None:
+                await asyncio.wait([self.stop_future])
+            self.disconnect()
+    
+    def start(self, update_rate=10.0):
+        """启动客户端"""
+        try:
+            asyncio.run(self.run(update_rate))
+        except KeyboardInterrupt:
+            logger.info("Shutting down client...")
         finally:
             self.stop()
     
     def stop(self):
         """停止客户端"""
         self.running = False
+        self.left_arm.stop_reader()
+        self.right_arm.stop_reader()
         self.disconnect()
-        print("Robot arm client stopped")
+        logger.info("Robot arm client stopped")
 
 if __name__ == "__main__":
+    log_listener = setup_logging()
     client = RobotArmClient()
     try:
         client.start()
     except KeyboardInterrupt:
-        print("\nShutting down...")
-        client.stop()
\ No newline at end of file
+        logger.info("Shutting down...")
+        client.stop()
+    finally:
+        log_listener.stop()
\ No newline at end of file